@@ -205,7 +205,9 @@ class Dataloader_ROInet(util.ROICaT_Module):
             If ``True``, pins the memory of the DataLoader, as per PyTorch's
             best practices. (Default is ``True``)
         numWorkers_dataloader (int): 
-            The number of worker processes for data loading. (Default is
+            The number of worker processes for data loading. If *-1*, uses
+            ``min(8, cpu_count // 2)`` workers, each limited to a single
+            intra-op thread to avoid oversubscribing the CPU. (Default is
             *-1*)
         persistentWorkers_dataloader (bool): 
             If ``True``, uses persistent worker processes. (Default is
@@ -254,7 +256,7 @@ class Dataloader_ROInet(util.ROICaT_Module):
         super().__init__()
 
         self._verbose = verbose
-        numWorkers_dataloader = mp.cpu_count() if numWorkers_dataloader == -1 else numWorkers_dataloader
+        numWorkers_dataloader = _default_numWorkers_dataloader() if numWorkers_dataloader == -1 else numWorkers_dataloader
 
         ## Store parameter (but not data) args as attributes
         self.params['__init__'] = self._locals_to_params(
@@ -315,6 +317,7 @@ class Dataloader_ROInet(util.ROICaT_Module):
                 num_workers=numWorkers_dataloader,
                 persistent_workers=persistentWorkers_dataloader,
                 prefetch_factor=prefetchFactor_dataloader,
+                worker_init_fn=_worker_init_singleThread if numWorkers_dataloader > 0 else None,
         )
         print(f'Defined dataloader') if self._verbose else None
 
@@ -533,7 +536,9 @@ class ROInet_embedder(util.ROICaT_Module):
                 If ``True``, pins the memory of the DataLoader, as per PyTorch's
                 best practices. (Default is ``True``)
             numWorkers_dataloader (int): 
-                The number of worker processes for data loading. (Default is
+                The number of worker processes for data loading. If *-1*, uses
+                ``min(8, cpu_count // 2)`` workers, each limited to a single
+                intra-op thread to avoid oversubscribing the CPU. (Default is
                 *-1*)
             persistentWorkers_dataloader (bool): 
                 If ``True``, uses persistent worker processes. (Default is
@@ -593,19 +598,20 @@ class ROInet_embedder(util.ROICaT_Module):
                 nan_to_num_val=nan_to_num_val,
                 verbose=False,
             )
+            ## Cast to float32 (what the dataloader uses) while concatenating, so no separate copy is made later
             self.ROI_images_rs = np.concatenate([
                 roi_resizer.resize_ROIs(
                     ROI_images=ROI_images[ii], 
                     um_per_pixel=um_per_pixel[ii],
                 ) for ii in range(len(ROI_images))
-            ], axis=0)
+            ], axis=0, dtype=np.float32)
 
             roi_resizer.plot_resized_comparison(
                 ROI_images_cat=np.concatenate(ROI_images, axis=0),
                 ROI_images_rs=self.ROI_images_rs,
             ) if pref_plot else None
         else:
-            self.ROI_images_rs = np.concatenate(ROI_images, axis=0)
+            self.ROI_images_rs = np.concatenate(ROI_images, axis=0, dtype=np.float32)
 
         print(f'Creating dataloader') if self._verbose else None
         dataloader_generator = Dataloader_ROInet(
@@ -845,7 +851,9 @@ class ROInet_embedder_original(util.ROICaT_Module):
                 If ``True``, pins the memory of the DataLoader, as per PyTorch's
                 best practices. (Default is ``True``)
             numWorkers_dataloader (int): 
-                The number of worker processes for data loading. (Default is
+                The number of worker processes for data loading. If *-1*, uses
+                ``min(8, cpu_count // 2)`` workers, each limited to a single
+                intra-op thread to avoid oversubscribing the CPU. (Default is
                 *-1*)
             persistentWorkers_dataloader (bool): 
                 If ``True``, uses persistent worker processes. (Default is
@@ -890,7 +898,7 @@ class ROInet_embedder_original(util.ROICaT_Module):
             ROI_images = [np.nan_to_num(rois, nan=nan_to_num_val) for rois in ROI_images]
 
         if numWorkers_dataloader == -1:
-            numWorkers_dataloader = mp.cpu_count()
+            numWorkers_dataloader = _default_numWorkers_dataloader()
 
         print('Starting: resizing ROIs') if self._verbose else None
         
@@ -955,6 +963,7 @@ class ROInet_embedder_original(util.ROICaT_Module):
                 num_workers=numWorkers_dataloader,
                 persistent_workers=persistentWorkers_dataloader,
                 prefetch_factor=prefetchFactor_dataloader,
+                worker_init_fn=_worker_init_singleThread if numWorkers_dataloader > 0 else None,
         )
 
         print(f'Defined dataloader') if self._verbose else None
@@ -1014,6 +1023,35 @@ class ROInet_embedder_original(util.ROICaT_Module):
         return self.latents
 
 
+###################################
+########### DATALOADER ############
+###################################
+
+def _default_numWorkers_dataloader() -> int:
+    """
+    Default number of DataLoader worker processes. Each worker runs its own
+    copy of the transforms, so using every core on top of PyTorch's intra-op
+    threads oversubscribes the CPU.
+
+    Returns:
+        (int):
+            numWorkers (int):
+                ``min(8, cpu_count // 2)``, and at least 1.
+    """
+    return max(1, min(8, mp.cpu_count() // 2))
+
+def _worker_init_singleThread(worker_id: int) -> None:
+    """
+    ``worker_init_fn`` for DataLoader workers. Limits each worker to a single
+    PyTorch intra-op thread.
+
+    Args:
+        worker_id (int):
+            ID of the worker. Unused.
+    """
+    torch.set_num_threads(1)
+
+
 ###################################
 ########### RESIZING ##############
 ###################################
@@ -1,13 +1,17 @@
+import os
 import pathlib
 from pathlib import Path
 import copy
+import hashlib
+import operator
+import tempfile
 import warnings
+import struct
+import zipfile
 from typing import List, Optional, Union, Tuple, Dict, Any, Callable, Iterable
 
 import numpy as np
-from tqdm import tqdm
 import scipy.sparse
-import sparse
 
 from . import helpers, util
 
@@ -679,21 +683,18 @@ class Data_roicat(util.ROICaT_Module):
         ## Calculate centroids
         sf = self.spatialFootprints
         FOV_height, FOV_width = self.FOV_height, self.FOV_width
-        ## Reshape sf to (n_roi, FOV_height, FOV_width)
-        sf_rs = [sparse.COO(s).reshape((s.shape[0], FOV_height, FOV_width), order='C') for s in sf]
-        ## Calculate the sum of the weights along each axis
-        y_w, x_w = [s.sum(axis=2) for s in sf_rs], [s.sum(axis=1) for s in sf_rs]
-        ## Calculate the centroids
         if method == 'centerOfMass':
-            y_cent = [(((w*np.arange(w.shape[1]).reshape(1,-1))).sum(1)/(w.sum(1)+1e-12)).todense() for w in y_w]
-            x_cent = [(((w*np.arange(w.shape[1]).reshape(1,-1))).sum(1)/(w.sum(1)+1e-12)).todense() for w in x_w]
+            ## Weighted mean of the (y, x) pixel coordinates, computed directly on the CSR arrays
+            func_centroids = _centroids_centerOfMass_csr
         elif method == 'median':
-            y_cent = [((((w!=0)*np.arange(w.shape[1]).reshape(1,-1, order='C'))).todense()).astype(np.float32) for w in y_w]
-            y_cent = [np.ma.masked_array(w, mask=(w==0)).filled(np.nan) for w in y_cent]
-            y_cent = [np.nanmedian(w, axis=1) for w in y_cent]
-            x_cent = [((((w!=0)*np.arange(w.shape[1]).reshape(1,-1, order='C'))).todense()).astype(np.float32) for w in x_w]
-            x_cent = [np.ma.masked_array(w, mask=(w==0)).filled(np.nan) for w in x_cent]
-            x_cent = [np.nanmedian(w, axis=1) for w in x_cent]
+            ## Median of the rows / columns occupied by each ROI, computed directly on the CSR arrays
+            func_centroids = _centroids_median_csr
+        ## Sessions are independent; numpy / scipy release the GIL, so threads work in parallel
+        yx_cent = _map_threads(
+            func=lambda s: func_centroids(sf=s, FOV_height=FOV_height, FOV_width=FOV_width),
+            args=[sf,],
+        )
+        y_cent, x_cent = [c[:, 0] for c in yx_cent], [c[:, 1] for c in yx_cent]
 
         ## Round to nearest integer
         y_cent = [np.round(h) for h in y_cent]
@@ -706,7 +707,8 @@ class Data_roicat(util.ROICaT_Module):
     
     def transform_spatialFootprints_to_ROIImages(
         self, 
-        out_height_width: Tuple[int, int] = (36, 36)
+        out_height_width: Tuple[int, int] = (36, 36),
+        output_dtype: np.dtype = np.float32,
     ) -> np.ndarray:
         """
         Transforms sparse spatial footprints to dense ROI images.
@@ -715,6 +717,11 @@ class Data_roicat(util.ROICaT_Module):
             out_height_width (Tuple[int, int]): 
                 Height and width of the output images. 
                 (Default is *(36, 36)*)
+            output_dtype (np.dtype):
+                Data type of the ROI images. A smaller floating point type
+                (e.g. ``np.float16``) reduces memory. For integer types (e.g.
+                ``np.uint8``), each ROI image is scaled so that its maximum maps
+                to the maximum of the type. (Default is ``np.float32``)
 
         Returns:
             (np.ndarray):
@@ -741,26 +748,24 @@ class Data_roicat(util.ROICaT_Module):
                 warnings.warn(f"RH WARNING: Found ROIs with all zero spatial footprints. Setting them to zero. This will affect the embedding results. Indices with all zero: {np.where(sf_sum==0)[0]}")
             if np.any(np.isnan(sf_sum)):
                 warnings.warn(f"RH WARNING: Found NaNs in the sum of the spatial footprints. Setting them to zero. This will affect the embedding results. Indices with NaN: {np.where(np.isnan(sf_sum))[0]}")
+                sf = sf.copy()
                 sf.data = np.nan_to_num(sf.data)
-            
-            half_widths = np.ceil(np.array(out_height_width)/2).astype(int)    
-            sf_rs_centered = sparse.COO(sf).reshape((sf.shape[0], self.FOV_height, self.FOV_width))  ## shape: (n_roi, FOV_height, FOV_width)
-
-            ## Shift coords to be centered on centroids
-            sf_rs_centered.coords[1:3] = sf_rs_centered.coords[1:3] - (centroids[sf_rs_centered.coords[0]].T - half_widths[:, None])
-            ## Set values with coords outside of out_height_width to 0
-            sf_rs_centered.data[(sf_rs_centered.coords[1:3] < 0).any(axis=0) | (sf_rs_centered.coords[1] >= out_height_width[0]) | (sf_rs_centered.coords[2] >= out_height_width[1])] = 0
-            ## Clip coords to within out_height_width
-            sf_rs_centered.coords[1] = np.clip(sf_rs_centered.coords[1], 0, out_height_width[0]-1)
-            sf_rs_centered.coords[2] = np.clip(sf_rs_centered.coords[2], 0, out_height_width[1]-1)
-            ## Crop to out_height_width
-            sf_rs_centered = sf_rs_centered[:, 0:out_height_width[0], 0:out_height_width[1]]
-            ## Cast and densify
-            return sf_rs_centered.astype(np.float32).todense()
+
+            ## Write the centered pixels directly into the dense output
+            return _sf_to_centeredROIs_csr(
+                sf=sf,
+                centroids=centroids,
+                FOV_width=self.FOV_width,
+                out_height_width=out_height_width,
+                dtype=output_dtype,
+            )
 
         ## Transform
         print(f"Starting: Creating centered ROI images from spatial footprints...") if self._verbose else None
-        self.ROI_images = [sf_to_centeredROIs(sf.copy(), centroids) for sf, centroids in zip(self.spatialFootprints, self.centroids)]
+        self.ROI_images = _map_threads(
+            func=sf_to_centeredROIs,
+            args=[self.spatialFootprints, self.centroids],
+        )
         print(f"Completed: Created ROI images.") if self._verbose else None
 
         return self.ROI_images
@@ -1021,6 +1026,12 @@ class Data_suite2p(Data_roicat):
         FOV_height_width (tuple of int, optional):
             FOV height and width. If ``None``, **paths_opsFiles** must be
             provided to get FOV height and width.
+        cache_spatialFootprints (bool):
+            If ``True``, the sparse spatial footprints made from each stat.npy
+            file are saved next to it as ``<stat path>.roicat.<settings
+            hash>.npz`` and are memory-mapped from there on later runs, as long
+            as the cache is newer than the stat file and was made with the same
+            settings. See ``import_spatialFootprints``. (Default is ``False``)
         verbose (bool):
             If ``True``, prints results from each function.
     """
@@ -1037,6 +1048,7 @@ class Data_suite2p(Data_roicat):
         class_labels: Optional[Union[List[np.ndarray], List[str], None]] = None,
         paths_iscell: Optional[Union[str, pathlib.Path, List[Union[str, pathlib.Path]]]] = None,
         FOV_height_width: Optional[Tuple[int, int]] = None,
+        cache_spatialFootprints: bool = False,
         verbose: bool = True,
     ):
         """
@@ -1063,14 +1075,21 @@ class Data_suite2p(Data_roicat):
                 'centroid_method', 
                 'paths_iscell',
                 'FOV_height_width',
+                'cache_spatialFootprints',
                 'verbose',
             ],
         )
 
         self._verbose = verbose
         
+        ## Load each ops file once, keeping only the entries needed for the shifts and the FOV images
+        ops = _load_opsFiles(
+            paths_ops=self.paths_ops,
+            keys=[type_meanImg] + (['yrange', 'xrange'] if new_or_old_suite2p == 'old' else []),
+        ) if self.paths_ops is not None else None
+
         ## shifts are applied to convert the 'old' matlab version of suite2p indexing (where there is an offset and its 1-indexed)
-        self.shifts = self._make_shifts(paths_ops=self.paths_ops, new_or_old_suite2p=new_or_old_suite2p)
+        self.shifts = self._make_shifts(paths_ops=self.paths_ops, new_or_old_suite2p=new_or_old_suite2p, ops=ops)
 
         ## Import FOV images
         ### Assert only one of self.paths_ops, FOV_images, or FOV_height_width is provided
@@ -1078,7 +1097,7 @@ class Data_suite2p(Data_roicat):
 
         ### Import FOV images if self.paths_ops or FOV_images is provided
         if self.paths_ops is not None:
-            FOV_images = self.import_FOV_images(type_meanImg=type_meanImg)
+            FOV_images = self.import_FOV_images(type_meanImg=type_meanImg, ops=ops)
         ### Set FOV height and width if FOV_height_width is provided
         elif FOV_height_width is not None:
             assert isinstance(FOV_height_width, tuple), "RH ERROR: FOV_height_width must be a tuple of length 2."
@@ -1088,7 +1107,7 @@ class Data_suite2p(Data_roicat):
         self.set_FOV_images(FOV_images=FOV_images) if FOV_images is not None else None
 
         ## Import spatial footprints
-        spatialFootprints = self.import_spatialFootprints()
+        spatialFootprints = self.import_spatialFootprints(use_cache=cache_spatialFootprints)
         self.set_spatialFootprints(spatialFootprints=spatialFootprints, um_per_pixel=um_per_pixel)
 
         ## Make session_bool
@@ -1104,12 +1123,14 @@ class Data_suite2p(Data_roicat):
         if class_labels is not None:
             self.set_class_labels(labels=class_labels)
         elif paths_iscell is not None:
-            self.set_class_labels(labels=[np.load(path)[:,0].astype(np.int64) for path in fix_paths(paths_iscell)])
+            ## Memory-map the iscell files so only the iscell column is copied out
+            self.set_class_labels(labels=[np.array(np.load(path, mmap_mode='r')[:,0], dtype=np.int64) for path in fix_paths(paths_iscell)])
 
 
     def import_FOV_images(
         self,
         type_meanImg: str = 'meanImgE',
+        ops: Optional[List[dict]] = None,
     ) -> List[np.ndarray]:
         """
         Imports the FOV images from ops files or user defined image arrays.
@@ -1120,6 +1141,10 @@ class Data_suite2p(Data_roicat):
                 Options are: \n
                 * ``'meanImgE'``: Enhanced mean image. 
                 * ``'meanImg'``: Mean image.
+            ops (Optional[List[dict]]):
+                Already loaded ops dictionaries, one for each session. If
+                provided, the images are taken from these instead of loading
+                ``self.paths_ops`` again. (Default is ``None``)
         
         Returns:
             FOV_images (List[np.ndarray]):
@@ -1130,16 +1155,28 @@ class Data_suite2p(Data_roicat):
 
         print(f"Starting: Importing FOV images from ops files") if self._verbose else None
         
-        assert self.paths_ops is not None, "RH ERROR: paths_ops is None. Please set paths_ops before calling this function."
-        assert len(self.paths_ops) > 0, "RH ERROR: paths_ops is empty. Please set paths_ops before calling this function."
-        assert all([Path(path).exists() for path in self.paths_ops]), f"RH ERROR: One or more paths in paths_ops do not exist: {[path for path in self.paths_ops if not Path(path).exists()]}"
-
-        FOV_images = [np.load(path, allow_pickle=True)[()][type_meanImg] for path in self.paths_ops]
-
-        assert all([FOV_images[0].shape[0] == FOV_images[i].shape[0] for i in range(1, len(FOV_images))]), f"RH ERROR: FOV images are not all the same height. Shapes: {[FOV_image.shape for FOV_image in FOV_images]}"
-        assert all([FOV_images[0].shape[1] == FOV_images[i].shape[1] for i in range(1, len(FOV_images))]), f"RH ERROR: FOV images are not all the same width. Shapes: {[FOV_image.shape for FOV_image in FOV_images]}"
-
-        FOV_images = np.stack(FOV_images, axis=0).astype(np.float32)
+        if ops is None:
+            assert self.paths_ops is not None, "RH ERROR: paths_ops is None. Please set paths_ops before calling this function."
+            assert len(self.paths_ops) > 0, "RH ERROR: paths_ops is empty. Please set paths_ops before calling this function."
+            assert all([Path(path).exists() for path in self.paths_ops]), f"RH ERROR: One or more paths in paths_ops do not exist: {[path for path in self.paths_ops if not Path(path).exists()]}"
+            load_meanImg = lambda idx: np.load(self.paths_ops[idx], allow_pickle=True)[()][type_meanImg]
+            n_images = len(self.paths_ops)
+        else:
+            assert len(ops) > 0, "RH ERROR: ops is empty."
+            load_meanImg = lambda idx: ops[idx][type_meanImg]
+            n_images = len(ops)
+
+        ## Use the first ops file to get the FOV shape and preallocate the float32 output
+        image_0 = load_meanImg(0)
+        FOV_images = np.empty((n_images, *image_0.shape), dtype=np.float32)
+        FOV_images[0] = image_0
+
+        ## Load the remaining ops files concurrently (I/O bound) and write each mean image directly into the output
+        def _fill_FOV_image(idx):
+            image = load_meanImg(idx)
+            assert image.shape == image_0.shape, f"RH ERROR: FOV images are not all the same shape. Shape of image {idx}: {image.shape}. Shape of image 0: {image_0.shape}"
+            FOV_images[idx] = image
+        _map_threads(func=_fill_FOV_image, args=[list(range(1, n_images)),])
 
         self.set_FOVHeightWidth(FOV_height=FOV_images[0].shape[0], FOV_width=FOV_images[0].shape[1])
         
@@ -1151,6 +1188,7 @@ class Data_suite2p(Data_roicat):
         self,
         frame_height_width: Optional[Union[List[int], Tuple[int, int]]] = None,
         dtype: np.dtype = np.float32,
+        use_cache: bool = False,
     ) -> List[scipy.sparse.csr_matrix]:
         """
         Imports and converts the spatial footprints of the ROIs in the stat
@@ -1167,6 +1205,15 @@ class Data_suite2p(Data_roicat):
                 from the first FOV image. (Default is ``None``)
             dtype (np.dtype):
                 Data type of the sparse array. (Default is ``np.float32``)
+            use_cache (bool):
+                If ``True``, each session's sparse array is saved to an
+                uncompressed ``<stat path>.roicat.<settings hash>.npz`` file
+                after it is made. If such a file already exists, is newer than
+                the stat file, and was made with the same frame size, shifts
+                and dtype, its arrays are memory-mapped instead of parsing the
+                stat file again. Note that each distinct frame size / shifts /
+                dtype leaves another .npz file next to the stat file, and these
+                files are never cleaned up. (Default is ``False``)
 
         Returns:
             (List[scipy.sparse.csr_matrix]): 
@@ -1188,17 +1235,42 @@ class Data_suite2p(Data_roicat):
 
         assert hasattr(self, 'shifts'), "RH ERROR: shifts is not defined. Please call ._make_shifts before calling this function."
 
-        statFiles = [np.load(path, allow_pickle=True) for path in self.paths_stat]
-
         n = self.n_sessions
-        spatialFootprints = [
-            _transform_statFile_to_spatialFootprints(
+        spatialFootprints = [None] * n
+        if use_cache:
+            metas_cache = [{
+                'frame_height_width': np.array(frame_height_width, dtype=np.int64),
+                'shifts': np.array(self.shifts[ii], dtype=np.int64),
+                'dtype': np.array(np.dtype(dtype).str),
+                'normalize_mask': np.array(True),
+            } for ii in range(n)]
+            paths_cache = [_make_path_spatialFootprints_npz(path_source=path, meta=meta) for path, meta in zip(self.paths_stat, metas_cache)]
+
+            ## Use the cached sparse arrays where they are valid
+            spatialFootprints = [
+                _load_spatialFootprints_npz(path_npz=paths_cache[ii], path_source=self.paths_stat[ii], meta=metas_cache[ii])
+                for ii in range(n)
+            ]
+
+        ## Make the rest from the stat files. Each thread loads and transforms one session,
+        ##  so the stat object arrays are shared in memory rather than pickled, and only
+        ##  the sessions currently being worked on are held in memory.
+        def _make_session(ii):
+            sf = _transform_statFile_to_spatialFootprints(
                 frame_height_width=frame_height_width,
-                stat=statFiles[ii],
+                stat=np.load(self.paths_stat[ii], allow_pickle=True),
                 shifts=self.shifts[ii],
                 dtype=dtype,
                 normalize_mask=True,
-            ) for ii in tqdm(range(n))]
+            )
+            if use_cache:
+                _save_spatialFootprints_npz(path_npz=paths_cache[ii], sf=sf, meta=metas_cache[ii])
+            spatialFootprints[ii] = sf
+        _map_threads(
+            func=_make_session,
+            args=[[ii for ii in range(n) if spatialFootprints[ii] is None],],
+            prog_bar=self._verbose,
+        )
 
         if self._verbose:
             print(f"Imported {len(spatialFootprints)} sessions of spatial footprints into sparse arrays.")
@@ -1239,15 +1311,16 @@ class Data_suite2p(Data_roicat):
 
         assert hasattr(self, 'shifts'), "RH ERROR: shifts is not defined. Please call ._make_shifts before calling this function."
 
-        statFiles = [np.load(path, allow_pickle=True) for path in self.paths_stat]
-
-        n = self.n_sessions
-        neuropilMasks = [
-            _transform_statFile_to_neuropilMasks(
+        ## Each thread loads and transforms one session (see import_spatialFootprints)
+        neuropilMasks = _map_threads(
+            func=lambda path, shifts: _transform_statFile_to_neuropilMasks(
                 frame_height_width=frame_height_width,
-                stat=statFiles[ii],
-                shifts=self.shifts[ii],
-            ) for ii in tqdm(range(n))]
+                stat=np.load(path, allow_pickle=True),
+                shifts=shifts,
+            ),
+            args=[list(self.paths_stat), list(self.shifts)],
+            prog_bar=self._verbose,
+        )
         
         if self._verbose:
             print(f"Imported {len(neuropilMasks)} sessions of neuropil masks into sparse arrays.")  
@@ -1260,6 +1333,7 @@ class Data_suite2p(Data_roicat):
         self, 
         paths_ops: Optional[List[str]] = None, 
         new_or_old_suite2p: str = 'new',
+        ops: Optional[List[dict]] = None,
     ) -> List[np.ndarray]:
         """
         Helper function to make the shifts for the old suite2p indexing.
@@ -1270,6 +1344,10 @@ class Data_suite2p(Data_roicat):
             new_or_old_suite2p (str):
                 Type of suite2p output files. Should be: ``'new'`` or ``'old'``.
                 Default is ``'new'``.
+            ops (list of dict, optional):
+                Already loaded ops dictionaries corresponding to ``paths_ops``.
+                If provided, the files are not loaded again. Default is
+                ``None``.
 
         Returns:
             (List[np.ndarray]):
@@ -1283,13 +1361,362 @@ class Data_suite2p(Data_roicat):
             return shifts
 
         if new_or_old_suite2p == 'old':
-            shifts = [np.array([op['yrange'].min()-1, op['xrange'].min()-1], dtype=np.uint64) for op in [np.load(path, allow_pickle=True)[()] for path in paths_ops]]
+            ops_to_shift = lambda op: np.array([op['yrange'].min()-1, op['xrange'].min()-1], dtype=np.uint64)
+            if ops is not None:
+                shifts = [ops_to_shift(op) for op in ops]
+            else:
+                shifts = _map_threads(
+                    func=lambda path: ops_to_shift(np.load(path, allow_pickle=True)[()]),
+                    args=[paths_ops,],
+                )
         elif new_or_old_suite2p == 'new':
             shifts = [np.array([0,0], dtype=np.uint64)]*len(paths_ops)
         else:
             raise ValueError(f"RH ERROR: new_or_old_suite2p should be 'new' or 'old'. Got {new_or_old_suite2p}")
         return shifts
 
+def _map_threads(
+    func: Callable,
+    args: List[Any],
+    prog_bar: bool = False,
+) -> List[Any]:
+    """
+    Maps a function over arguments on a thread pool using
+    ``helpers.map_parallel``. If a job fails, its original exception is
+    re-raised instead of a ``helpers.ParallelExecutionError``, so that callers
+    see the same errors as when running serially.
+
+    Args:
+        func (Callable):
+            The function to be mapped.
+        args (List[Any]):
+            List of arguments to which the function should be mapped. See
+            ``helpers.map_parallel``.
+        prog_bar (bool):
+            Whether to display a progress bar. (Default is ``False``)
+
+    Returns:
+        (List[Any]):
+            output (List[Any]):
+                List of results from mapping the function to the arguments.
+    """
+    try:
+        return helpers.map_parallel(func=func, args=args, method='multithreading', n_workers=-1, prog_bar=prog_bar)
+    except helpers.ParallelExecutionError as e:
+        raise e.original_exception
+
+def _load_opsFiles(
+    paths_ops: List[str],
+    keys: List[str],
+) -> List[dict]:
+    """
+    Loads suite2p ops.npy files concurrently using a thread pool and keeps
+    only the requested entries of each ops dictionary.
+
+    Args:
+        paths_ops (List[str]):
+            Paths to the ops.npy files.
+        keys (List[str]):
+            Keys of the ops dictionaries to keep. Missing keys are skipped.
+
+    Returns:
+        (List[dict]):
+            ops (List[dict]):
+                List of trimmed ops dictionaries, one for each session.
+    """
+    def _load_ops(path):
+        op = np.load(path, allow_pickle=True)[()]
+        return {key: op[key] for key in keys if key in op}
+    return _map_threads(func=_load_ops, args=[list(paths_ops),])
+
+def _memmap_npz(
+    path: Union[str, pathlib.Path],
+    mode: str = 'c',
+) -> Dict[str, np.ndarray]:
+    """
+    Memory-maps the arrays inside an uncompressed .npz file (as made by
+    ``np.savez``). ``np.load`` ignores ``mmap_mode`` for .npz files, so the
+    offset of each member's .npy data within the zip file is found by reading
+    its local file header and .npy header.
+
+    Args:
+        path (Union[str, pathlib.Path]):
+            Path to the .npz file.
+        mode (str):
+            Mode passed to ``np.memmap``. The default ``'c'`` (copy-on-write)
+            allows in-place changes to the arrays without writing to the file.
+            (Default is ``'c'``)
+
+    Returns:
+        (Dict[str, np.ndarray]):
+            arrays (Dict[str, np.ndarray]):
+                Memory-mapped arrays, keyed by their names in the .npz file.
+    """
+    arrays = {}
+    with zipfile.ZipFile(path) as zf, open(path, 'rb') as f:
+        for info in zf.infolist():
+            assert info.compress_type == zipfile.ZIP_STORED, f"RH ERROR: Cannot memory-map compressed member {info.filename} of {path}."
+            ## Skip the zip local file header (30 bytes + file name + extra field)
+            f.seek(info.header_offset + 26)
+            len_name, len_extra = struct.unpack('<HH', f.read(4))
+            f.seek(info.header_offset + 30 + len_name + len_extra)
+            ## Read the .npy header
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            arrays[info.filename[:-4] if info.filename.endswith('.npy') else info.filename] = np.memmap(
+                path,
+                dtype=dtype,
+                mode=mode,
+                shape=shape,
+                order='F' if fortran_order else 'C',
+                offset=f.tell(),
+            )
+    return arrays
+
+def _make_path_spatialFootprints_npz(
+    path_source: Union[str, pathlib.Path],
+    meta: Dict[str, np.ndarray],
+) -> str:
+    """
+    Makes the path of the .npz cache file for the spatial footprints made from
+    ``path_source`` with the settings in ``meta``. A hash of the settings is
+    part of the file name, so caches made with different settings are kept in
+    separate files.
+
+    Args:
+        path_source (Union[str, pathlib.Path]):
+            Path to the file the spatial footprints are made from.
+        meta (Dict[str, np.ndarray]):
+            Settings used to make the spatial footprints.
+
+    Returns:
+        (str):
+            path_npz (str):
+                Path to the .npz cache file.
+    """
+    hasher = hashlib.sha1()
+    for key in sorted(meta.keys()):
+        val = np.asarray(meta[key])
+        hasher.update(f"{key}:{val.dtype.str}:{val.shape}:".encode())
+        hasher.update(val.tobytes())
+    return f"{str(path_source)}.roicat.{hasher.hexdigest()[:16]}.npz"
+
+def _save_spatialFootprints_npz(
+    path_npz: Union[str, pathlib.Path],
+    sf: scipy.sparse.csr_matrix,
+    meta: Dict[str, np.ndarray],
+) -> bool:
+    """
+    Saves a sparse array of spatial footprints and the settings used to make it
+    to an uncompressed .npz file, so that it can be memory-mapped by
+    ``_load_spatialFootprints_npz``. \n
+    The arrays are written to a temporary file in the same directory which is
+    then moved over ``path_npz``. An existing cache file is therefore never
+    rewritten in place, and objects that still memory-map it keep their data.
+    Errors while saving (e.g. read-only directory, full disk) are turned into
+    warnings.
+
+    Args:
+        path_npz (Union[str, pathlib.Path]):
+            Path to save the .npz file to.
+        sf (scipy.sparse.csr_matrix):
+            Spatial footprints.
+        meta (Dict[str, np.ndarray]):
+            Settings used to make ``sf``. Checked when loading.
+
+    Returns:
+        (bool):
+            success (bool):
+                Whether the cache file was saved.
+    """
+    path_tmp = None
+    try:
+        with tempfile.NamedTemporaryFile(dir=str(Path(path_npz).parent), prefix=Path(path_npz).name + '.', suffix='.tmp', delete=False) as f:
+            path_tmp = f.name
+            np.savez(
+                f,
+                data=sf.data,
+                indices=sf.indices,
+                indptr=sf.indptr,
+                shape=np.array(sf.shape, dtype=np.int64),
+                **{'meta_' + key: val for key, val in meta.items()},
+            )
+        os.replace(path_tmp, path_npz)
+        return True
+    except Exception as e:
+        warnings.warn(f"RH WARNING: Could not save cached spatial footprints to {path_npz}. Error: {e}")
+        if path_tmp is not None and Path(path_tmp).exists():
+            try:
+                os.remove(path_tmp)
+            except OSError:
+                pass
+        return False
+
+def _load_spatialFootprints_npz(
+    path_npz: Union[str, pathlib.Path],
+    path_source: Union[str, pathlib.Path],
+    meta: Dict[str, np.ndarray],
+) -> Optional[scipy.sparse.csr_matrix]:
+    """
+    Loads spatial footprints saved by ``_save_spatialFootprints_npz``. The
+    arrays are memory-mapped rather than read.
+
+    Args:
+        path_npz (Union[str, pathlib.Path]):
+            Path to the .npz file.
+        path_source (Union[str, pathlib.Path]):
+            Path to the file the spatial footprints were made from. The cache
+            is not used if this file is newer than it.
+        meta (Dict[str, np.ndarray]):
+            Settings that the cached spatial footprints must have been made
+            with.
+
+    Returns:
+        (Optional[scipy.sparse.csr_matrix]):
+            sf (Optional[scipy.sparse.csr_matrix]):
+                Spatial footprints. ``None`` if the cache is missing, stale, or
+                was made with different settings.
+    """
+    if not Path(path_npz).exists() or (Path(path_npz).stat().st_mtime < Path(path_source).stat().st_mtime):
+        return None
+    try:
+        arrays = _memmap_npz(path_npz)
+    except Exception as e:
+        warnings.warn(f"RH WARNING: Could not load cached spatial footprints from {path_npz}. Remaking them. Error: {e}")
+        return None
+    if not all([('meta_' + key in arrays) and np.array_equal(arrays['meta_' + key], val) for key, val in meta.items()]):
+        return None
+    return scipy.sparse.csr_matrix(
+        (arrays['data'], arrays['indices'], arrays['indptr']),
+        shape=tuple(int(s) for s in arrays['shape']),
+        copy=False,
+    )
+
+def _stat_field_to_array(
+    values: Union[np.ndarray, List, Tuple],
+    dtype: np.dtype,
+) -> np.ndarray:
+    """
+    Converts one field of a suite2p stat entry (e.g. ``'lam'`` or
+    ``'ypix'``) to a 1-D numpy array. Arrays are returned without copying and
+    Python lists are filled at C-level with ``np.fromiter`` instead of having
+    their dtype inferred element by element.
+
+    Args:
+        values (Union[np.ndarray, List, Tuple]):
+            Values of the field.
+        dtype (np.dtype):
+            Data type to use when ``values`` is a list or tuple.
+
+    Returns:
+        (np.ndarray):
+            values_array (np.ndarray):
+                Array with at least 1 dimension.
+    """
+    if isinstance(values, np.ndarray):
+        return np.atleast_1d(values)
+    if isinstance(values, (list, tuple)):
+        return np.fromiter(values, dtype=dtype, count=len(values))
+    return np.array(values, ndmin=1)
+
+def _sum_duplicates_csr(
+    sf: scipy.sparse.csr_matrix,
+) -> scipy.sparse.csr_matrix:
+    """
+    Puts a sparse array into canonical format (sorted column indices and no
+    duplicate entries within each row) **in place**. If the column indices
+    are already strictly increasing within every row, the array is only
+    flagged as canonical, and the sort / merge pass of ``sum_duplicates``
+    is skipped.
+
+    Args:
+        sf (scipy.sparse.csr_matrix):
+            Sparse array to canonicalize.
+
+    Returns:
+        (scipy.sparse.csr_matrix):
+            sf (scipy.sparse.csr_matrix):
+                The same sparse array, now in canonical format.
+    """
+    indices, indptr = sf.indices, sf.indptr
+    increasing = indices[1:] > indices[:-1]
+    ## Comparisons across the boundary between two rows don't matter
+    bounds = indptr[1:-1]
+    increasing[bounds[(bounds > 0) & (bounds < indices.size)] - 1] = True
+    if increasing.all():
+        sf.has_canonical_format = True
+    else:
+        sf.sum_duplicates()
+    return sf
+
+def _csr_index_dtype(
+    n_cols: int,
+    nnz: int,
+) -> np.dtype:
+    """
+    Chooses the index dtype of a sparse array the way scipy does: 32-bit when
+    the number of columns and of stored elements fit, 64-bit otherwise. Index
+    arrays made in this dtype are not downcast again by the CSR constructor.
+
+    Args:
+        n_cols (int):
+            Number of columns of the sparse array.
+        nnz (int):
+            Number of stored elements of the sparse array.
+
+    Returns:
+        (np.dtype):
+            idx_dtype (np.dtype):
+                ``np.int32`` or ``np.int64``.
+    """
+    return np.dtype(np.int32) if max(int(n_cols), int(nnz)) < np.iinfo(np.int32).max else np.dtype(np.int64)
+
+def _make_csr_from_rows(
+    lens: np.ndarray,
+    indices: np.ndarray,
+    data: np.ndarray,
+    shape: Tuple[int, int],
+) -> scipy.sparse.csr_matrix:
+    """
+    Makes a sparse array in which row ``ii`` holds the next ``lens[ii]``
+    elements of ``indices`` and ``data``. The column indices are checked to be
+    within ``[0, shape[1])`` (the CSR constructor does not check them), and the
+    result is put into canonical format with ``_sum_duplicates_csr``.
+
+    Args:
+        lens (np.ndarray):
+            Number of stored elements in each row. Shape: *(shape[0],)*
+        indices (np.ndarray):
+            Column index of each stored element, ordered by row. Shape:
+            *(nnz,)*
+        data (np.ndarray):
+            Value of each stored element. Shape: *(nnz,)*
+        shape (Tuple[int, int]):
+            Shape of the sparse array.
+
+    Returns:
+        (scipy.sparse.csr_matrix):
+            sf (scipy.sparse.csr_matrix):
+                Sparse array in canonical format.
+    """
+    n_rows, n_cols = int(shape[0]), int(shape[1])
+    assert len(lens) == n_rows, f"RH ERROR: len(lens) must equal the number of rows. Got {len(lens)} and {n_rows}."
+    if (indices.size > 0) and ((indices.min() < 0) or (indices.max() >= n_cols)):
+        raise ValueError(f"RH ERROR: Pixel indices fall outside of the frame of {n_cols} pixels.")
+
+    ## Each ROI is one row of the output, so indptr is just the cumulative number of pixels per ROI
+    idx_dtype = _csr_index_dtype(n_cols=n_cols, nnz=indices.size)
+    indptr = np.zeros(n_rows + 1, dtype=idx_dtype)
+    np.cumsum(lens, out=indptr[1:])
+    assert indptr[-1] == indices.size == data.size, f"RH ERROR: sum(lens), len(indices) and len(data) must match. Got {indptr[-1]}, {indices.size} and {data.size}."
+
+    sf = scipy.sparse.csr_matrix((data, indices.astype(idx_dtype, copy=False), indptr), shape=(n_rows, n_cols))
+    ## Sort the column indices within each row (and merge any duplicate pixels)
+    return _sum_duplicates_csr(sf)
+
 def _transform_statFile_to_spatialFootprints(
     frame_height_width: Tuple[int, int], 
     stat: np.ndarray, 
@@ -1311,7 +1738,8 @@ def _transform_statFile_to_spatialFootprints(
             0).
         dtype (Optional[np.dtype]):
             Data type of the array elements. If ``None``, it will be
-            inferred from the data. Default is ``None``.
+            inferred from the data (``float64`` if the weights are integers
+            and ``normalize_mask`` is ``True``). Default is ``None``.
         normalize_mask (bool):
             If True, normalize the mask. Default is ``True``.
 
@@ -1321,24 +1749,63 @@ def _transform_statFile_to_spatialFootprints(
                 Sparse array of shape *(n_roi, frame_height * frame_width)*
                 containing the spatial footprints of the ROIs.
     """
-    isInt = np.issubdtype(dtype, np.integer)
+    n_roi = len(stat)
+    height, width = int(frame_height_width[0]), int(frame_height_width[1])
+
+    ## Pull the per-ROI arrays out of the stat dicts in a single traversal (array-of-structs -> struct-of-arrays)
+    lams, ypixs, xpixs = [
+        [_stat_field_to_array(v, dtype=dtype_list) for v in values] 
+        for values, dtype_list in zip(
+            zip(*map(operator.itemgetter('lam', 'ypix', 'xpix'), stat)),
+            (np.float64, np.int64, np.int64),
+        )
+    ] if n_roi > 0 else ([], [], [])
 
-    rois_to_stack = []
-    
-    for jj, roi in enumerate(stat):
-        lam = np.array(roi['lam'], ndmin=1)
-        dtype = dtype if dtype is not None else lam.dtype
-        if isInt:
-            lam = dtype(lam / lam.sum() * np.iinfo(dtype).max) if normalize_mask else dtype(lam)
-        else:
-            lam = lam / lam.sum() if normalize_mask else lam
-        ypix = np.array(roi['ypix'], dtype=np.uint64, ndmin=1) + shifts[0]
-        xpix = np.array(roi['xpix'], dtype=np.uint64, ndmin=1) + shifts[1]
-    
-        tmp_roi = scipy.sparse.csr_matrix((lam, (ypix, xpix)), shape=(frame_height_width[0], frame_height_width[1]), dtype=dtype)
-        rois_to_stack.append(tmp_roi.reshape(1,-1))
+    if dtype is None:
+        dtype = lams[0].dtype if n_roi > 0 else np.dtype(np.float64)
+        ## Normalized weights are fractions, so inferring an integer dtype from lam would not hold them
+        dtype = np.dtype(np.float64) if (normalize_mask and not np.issubdtype(dtype, np.floating)) else dtype
+    isInt = np.issubdtype(dtype, np.integer)
 
-    return scipy.sparse.vstack(rois_to_stack).tocsr()
+    lens = np.fromiter((l.size for l in lams), dtype=np.int64, count=n_roi)
+    nnz = int(lens.sum())
+
+    ## Concatenate the pixel coordinates of all ROIs once and convert them to flat column indices in place.
+    ##  Shifts are cast to python ints so that adding them does not promote the integer coordinates to float64,
+    ##  and are skipped entirely in the common (new suite2p) case where they are zero.
+    indices = np.empty(nnz, dtype=_csr_index_dtype(n_cols=height * width, nnz=nnz))
+    if indices.size > 0:
+        np.concatenate(ypixs, out=indices, casting='unsafe')
+        xpix = np.concatenate(xpixs)
+        ## Flat indices of pixels outside the frame would silently wrap into a neighboring row, so check the bounds first
+        if (indices.min() + int(shifts[0]) < 0) or (indices.max() + int(shifts[0]) >= height) or (xpix.min() + int(shifts[1]) < 0) or (xpix.max() + int(shifts[1]) >= width):
+            raise ValueError(f"RH ERROR: Shifted ROI pixels fall outside of the frame of shape {(height, width)}.")
+        indices *= width
+        np.add(indices, xpix, out=indices, casting='unsafe')
+        ## (ypix + shift_y) * width + (xpix + shift_x): both shifts fold into one flat offset added across all ROIs at once
+        shift_flat = int(shifts[0]) * width + int(shifts[1])
+        if shift_flat != 0:
+            indices += shift_flat
+
+    ## Normalize the weights of each ROI to sum to 1 (or to the max of the integer dtype), all ROIs at once
+    ##  The per-ROI sums use each ROI's own (pairwise) .sum() so that the result is identical to
+    ##  normalizing each ROI separately; a segmented np.add.reduceat sums in a different order.
+    ##  The arithmetic is done in the dtype that dividing lam by its sum gives, in place, and the result
+    ##  lands in a single buffer of the target dtype (directly, when the two dtypes are the same).
+    data = np.empty(nnz, dtype=dtype)
+    if normalize_mask:
+        lam_dtype = lams[0].dtype if n_roi > 0 else data.dtype
+        work_dtype = lam_dtype if np.issubdtype(lam_dtype, np.floating) else np.dtype(np.float64)
+        lam = data if data.dtype == work_dtype else np.empty(nnz, dtype=work_dtype)
+        np.concatenate(lams, out=lam, casting='unsafe') if n_roi > 0 else None
+        sums = np.fromiter((l.sum() for l in lams), dtype=work_dtype, count=n_roi)
+        np.divide(lam, np.repeat(sums, lens), out=lam)
+        np.multiply(lam, np.iinfo(dtype).max, out=lam) if isInt else None
+        np.copyto(data, lam, casting='unsafe') if lam is not data else None
+    elif n_roi > 0:
+        np.concatenate(lams, out=data, casting='unsafe')
+
+    return _make_csr_from_rows(lens=lens, indices=indices, data=data, shape=(n_roi, height * width))
 
 def _transform_statFile_to_neuropilMasks(
     frame_height_width: Tuple[int, int], 
@@ -1364,20 +1831,24 @@ def _transform_statFile_to_neuropilMasks(
                 Sparse array of shape *(n_roi, frame_height * frame_width)*
                 containing the neuropil masks of the ROIs.
     """
-    
-    rois_to_stack = []
-    
-    for jj, roi in enumerate(stat):
-        lam = np.ones(len(roi['neuropil_mask']), dtype=np.bool_)
-        dtype = np.bool_
-        ypix, xpix = np.unravel_index(roi['neuropil_mask'], shape=(frame_height_width[0], frame_height_width[1]), order='C')
-        ypix = ypix + shifts[0]
-        xpix = xpix + shifts[1]
-    
-        tmp_roi = scipy.sparse.csr_matrix((lam, (ypix, xpix)), shape=(frame_height_width[0], frame_height_width[1]), dtype=dtype)
-        rois_to_stack.append(tmp_roi.reshape(1,-1))
+    n_roi = len(stat)
+    height, width = int(frame_height_width[0]), int(frame_height_width[1])
+
+    masks = [np.array(roi['neuropil_mask'], ndmin=1) for roi in stat]
+    lens = np.fromiter((m.size for m in masks), dtype=np.int64, count=n_roi)
+    nnz = int(lens.sum())
 
-    return scipy.sparse.vstack(rois_to_stack).tocsr()
+    ## The neuropil masks are already flat ('C' order) pixel indices, so they are the column indices once shifted.
+    ##  Unshifted indices outside of the frame are caught by _make_csr_from_rows.
+    indices = np.empty(nnz, dtype=_csr_index_dtype(n_cols=height * width, nnz=nnz))
+    np.concatenate(masks, out=indices, casting='unsafe') if n_roi > 0 else None
+    if (int(shifts[0]) != 0 or int(shifts[1]) != 0) and indices.size > 0:
+        ypix, xpix = np.divmod(indices, width)
+        if (ypix.min() + int(shifts[0]) < 0) or (ypix.max() + int(shifts[0]) >= height) or (xpix.min() + int(shifts[1]) < 0) or (xpix.max() + int(shifts[1]) >= width):
+            raise ValueError(f"RH ERROR: Shifted neuropil mask pixels fall outside of the frame of shape {(height, width)}.")
+        indices += int(shifts[0]) * width + int(shifts[1])
+
+    return _make_csr_from_rows(lens=lens, indices=indices, data=np.ones(nnz, dtype=np.bool_), shape=(n_roi, height * width))
 
 
 #########################################################
@@ -1449,22 +1920,61 @@ class Data_caiman(Data_roicat):
         # # self.n_roi
         # # self.n_roi_total
         
-        spatialFootprints = [self.import_spatialFootprints(path, include_discarded=include_discarded) for path in self.paths_resultsFiles]
+        ## Open each results file once and pull out everything needed from it
+        results = [self.import_caimanResults(path, include_discarded=include_discarded) for path in self.paths_resultsFiles]
+
+        spatialFootprints = [r['spatialFootprints'] for r in results]
         self.set_spatialFootprints(spatialFootprints=spatialFootprints, um_per_pixel=um_per_pixel)
 
-        overall_caimanLabels = [self.import_overall_caiman_labels(path, include_discarded=include_discarded) for path in self.paths_resultsFiles]
+        overall_caimanLabels = [r['overall_caimanLabels'] for r in results]
         self.set_caimanLabels(overall_caimanLabels=overall_caimanLabels)
 
-        cnn_caimanPreds = [self.import_cnn_caiman_preds(path, include_discarded=include_discarded) for path in self.paths_resultsFiles]
+        cnn_caimanPreds = [r['cnn_caimanPreds'] for r in results]
         self.set_caimanPreds(cnn_caimanPreds=cnn_caimanPreds) if cnn_caimanPreds[0] is not None else None
 
-        FOV_images = self.import_FOV_images(self.paths_resultsFiles)
+        FOV_images = self._normalize_FOV_images(np.stack([r['FOV_image'] for r in results]))
         self.set_FOV_images(FOV_images=FOV_images)
         self._make_spatialFootprintCentroids(method=centroid_method)
         self._make_session_bool()
         self.transform_spatialFootprints_to_ROIImages(out_height_width=out_height_width)
         self.set_class_labels(labels=class_labels) if class_labels is not None else None
 
+    def import_caimanResults(
+        self,
+        path_resultsFile: Union[str, pathlib.Path],
+        include_discarded: bool = True,
+    ) -> Dict[str, Any]:
+        """
+        Imports the spatial footprints, overall CaImAn labels, CNN-CaImAn
+        predictions and FOV image from a single results file. The file is only
+        opened once.
+
+        Args:
+            path_resultsFile (Union[str, pathlib.Path]):
+                Path to a single results file.
+            include_discarded (bool):
+                If ``True``, include ROIs that were discarded by CaImAn. Default
+                is ``True``.
+
+        Returns:
+            (Dict[str, Any]):
+                results (Dict[str, Any]):
+                    Dictionary with keys: \n
+                    * ``'spatialFootprints'``: See ``import_spatialFootprints``.
+                    * ``'overall_caimanLabels'``: See
+                      ``import_overall_caiman_labels``.
+                    * ``'cnn_caimanPreds'``: See ``import_cnn_caiman_preds``.
+                    * ``'FOV_image'``: Un-normalized FOV image of shape
+                      *(FOV_height, FOV_width)*.
+        """
+        with helpers.h5_load(path_resultsFile, return_dict=False) as data:
+            return {
+                'spatialFootprints': self._extract_spatialFootprints(data, include_discarded=include_discarded),
+                'overall_caimanLabels': self._extract_overall_caiman_labels(data, include_discarded=include_discarded),
+                'cnn_caimanPreds': self._extract_cnn_caiman_preds(data, include_discarded=include_discarded),
+                'FOV_image': self._extract_FOV_image(data),
+            }
+
     def set_caimanLabels(self, overall_caimanLabels: List[List[bool]]) -> None:
         """
         Sets the CaImAn labels.
@@ -1517,26 +2027,39 @@ class Data_caiman(Data_roicat):
                     Spatial footprints.
         """
         with helpers.h5_load(path_resultsFile, return_dict=False) as data:
-            FOV_height, FOV_width = data['estimates']['dims'][()]
-            
-            ## initialize the estimates.A matrix, which is a 'Fortran' indexed version of sf. Note the flipped dimensions for shape.
-            sf_included = scipy.sparse.csr_matrix((data['estimates']['A']['data'][()], data['estimates']['A']['indices'], data['estimates']['A']['indptr'][()]), shape=data['estimates']['A']['shape'][()][::-1])
-            print('kept ROIs',sf_included.shape)
-            if include_discarded:
-                try:
-                    discarded = data['estimates']['discarded_components'][()]
-                    sf_discarded = scipy.sparse.csr_matrix((discarded['A']['data'], discarded['A']['indices'], discarded['A']['indptr']), shape=discarded['A']['shape'][::-1])
-                    print('dropped ROIs',sf_discarded.shape)
-                    sf_F = scipy.sparse.vstack([sf_included, sf_discarded])
-                except:
-                    sf_F = sf_included
-            else:
-                sf_F = sf_included
+            return self._extract_spatialFootprints(data, include_discarded=include_discarded)
 
-            ## reshape sf_F (which is in Fortran flattened format) into C flattened format
-            sf = sparse.COO(sf_F).reshape((sf_F.shape[0], FOV_width, FOV_height)).transpose((0,2,1)).reshape((sf_F.shape[0], FOV_width*FOV_height)).tocsr()
-            
-            return sf
+    @staticmethod
+    def _extract_spatialFootprints(data: Any, include_discarded: bool = True) -> scipy.sparse.csr_matrix:
+        """
+        Extracts the spatial footprints from an open results file. See
+        ``import_spatialFootprints``.
+        """
+        FOV_height, FOV_width = data['estimates']['dims'][()]
+        
+        ## initialize the estimates.A matrix, which is a 'Fortran' indexed version of sf. Note the flipped dimensions for shape.
+        sf_included = scipy.sparse.csr_matrix((data['estimates']['A']['data'][()], data['estimates']['A']['indices'], data['estimates']['A']['indptr'][()]), shape=data['estimates']['A']['shape'][()][::-1])
+        print('kept ROIs',sf_included.shape)
+        if include_discarded:
+            try:
+                discarded = data['estimates']['discarded_components'][()]
+                sf_discarded = scipy.sparse.csr_matrix((discarded['A']['data'], discarded['A']['indices'], discarded['A']['indptr']), shape=discarded['A']['shape'][::-1])
+                print('dropped ROIs',sf_discarded.shape)
+                sf_F = scipy.sparse.vstack([sf_included, sf_discarded])
+            except:
+                sf_F = sf_included
+        else:
+            sf_F = sf_included
+
+        ## reshape sf_F (which is in Fortran flattened format) into C flattened format
+        ### Pixel (y, x) has index y + x*FOV_height in 'F' order and y*FOV_width + x in 'C' order, so only the column indices need remapping
+        sf_F = sf_F.tocsr()
+        FOV_height, FOV_width = int(FOV_height), int(FOV_width)
+        indices_C = (sf_F.indices % FOV_height) * FOV_width + (sf_F.indices // FOV_height)
+        sf = scipy.sparse.csr_matrix((sf_F.data, indices_C, sf_F.indptr), shape=(sf_F.shape[0], FOV_height*FOV_width))
+        sf.sort_indices()
+        
+        return sf
 
     def import_overall_caiman_labels(
         self, 
@@ -1561,19 +2084,27 @@ class Data_caiman(Data_roicat):
         """
 
         with helpers.h5_load(path_resultsFile, return_dict=False) as data:
-            labels_included = np.ones(data['estimates']['A']['indptr'][()].shape[0] - 1)
-            if include_discarded:
-                try:
-                    discarded = data['estimates']['discarded_components'][()]
-                    labels_discarded = np.zeros(discarded['A']['indptr'].shape[0] - 1)
-                    labels = np.hstack([labels_included, labels_discarded])
-                except:
-                    print('no discarded components for labels')
-                    labels = labels_included
-            else:
+            return self._extract_overall_caiman_labels(data, include_discarded=include_discarded)
+
+    @staticmethod
+    def _extract_overall_caiman_labels(data: Any, include_discarded: bool = True) -> np.ndarray:
+        """
+        Extracts the overall CaImAn labels from an open results file. See
+        ``import_overall_caiman_labels``.
+        """
+        labels_included = np.ones(data['estimates']['A']['indptr'][()].shape[0] - 1)
+        if include_discarded:
+            try:
+                discarded = data['estimates']['discarded_components'][()]
+                labels_discarded = np.zeros(discarded['A']['indptr'].shape[0] - 1)
+                labels = np.hstack([labels_included, labels_discarded])
+            except:
+                print('no discarded components for labels')
                 labels = labels_included
+        else:
+            labels = labels_included
 
-            return labels
+        return labels
 
     def import_cnn_caiman_preds(
         self, 
@@ -1599,31 +2130,47 @@ class Data_caiman(Data_roicat):
         """
 
         with helpers.h5_load(path_resultsFile, return_dict=False) as data:
-            preds_included = data['estimates']['cnn_preds'][()]
-            if preds_included == b'NoneType':
-                warnings.warn('No CNN preds found in results file')
-                return None
-            
-            if include_discarded:
-                try:
-                    discarded = data['estimates']['discarded_components'][()]
-                    preds_discarded = discarded['cnn_preds']
-                    preds = np.hstack([preds_included, preds_discarded])
-                except:
-                    print('no discarded components for cnn_preds')
-                    preds = preds_included
-            else:
+            return self._extract_cnn_caiman_preds(data, include_discarded=include_discarded)
+
+    @staticmethod
+    def _extract_cnn_caiman_preds(data: Any, include_discarded: bool = True) -> Union[np.ndarray, None]:
+        """
+        Extracts the CNN-based CaImAn prediction probabilities from an open
+        results file. See ``import_cnn_caiman_preds``.
+        """
+        preds_included = data['estimates']['cnn_preds'][()]
+        if preds_included == b'NoneType':
+            warnings.warn('No CNN preds found in results file')
+            return None
+        
+        if include_discarded:
+            try:
+                discarded = data['estimates']['discarded_components'][()]
+                preds_discarded = discarded['cnn_preds']
+                preds = np.hstack([preds_included, preds_discarded])
+            except:
+                print('no discarded components for cnn_preds')
                 preds = preds_included
-            
-            return preds
+        else:
+            preds = preds_included
+        
+        return preds
 
-    def import_ROI_centeredImages(self, out_height_width: List[int] = [36,36]) -> np.ndarray:
+    def import_ROI_centeredImages(
+        self,
+        out_height_width: List[int] = [36,36],
+        output_dtype: np.dtype = np.float32,
+    ) -> np.ndarray:
         """
         Imports the ROI centered images from the CaImAn results files.
 
         Args:
             out_height_width (List[int]): 
                 Height and width of the output images. Default is *[36,36]*.
+            output_dtype (np.dtype):
+                Data type of the ROI images. For integer types, each ROI image
+                is scaled so that its maximum maps to the maximum of the type.
+                Default is ``np.float32``.
 
         Returns:
             (np.ndarray):
@@ -1631,26 +2178,20 @@ class Data_caiman(Data_roicat):
                     ROI centered images. Shape is *(nROIs, out_height_width[0],
                     out_height_width[1])*.
         """
-        def sf_to_centeredROIs(sf, centroids, out_height_width=36):
-            out_height_width = np.array([36,36])
-            half_widths = np.ceil(out_height_width/2).astype(int)
-            sf_rs = sparse.COO(sf).reshape((sf.shape[0], self.FOV_height, self.FOV_width))
-            
-            coords_diff = np.diff(sf_rs.coords[0])
-            assert np.all(coords_diff < 1.01) and np.all(coords_diff > -0.01), \
-                "RH ERROR: sparse.COO object has strange .coords attribute. sf_rs.coords[0] should all be 0 or 1. An ROI is possibly all zeros."
-            
-            idx_split = (sf_rs>0).astype(np.bool_).sum((1,2)).todense().cumsum()[:-1]
-            coords_split = [np.split(sf_rs.coords[ii], idx_split) for ii in [0,1,2]]
-            coords_split[1] = [coords - centroids[0][ii] + half_widths[0] for ii,coords in enumerate(coords_split[1])]
-            coords_split[2] = [coords - centroids[1][ii] + half_widths[1] for ii,coords in enumerate(coords_split[2])]
-            sf_rs_centered = sf_rs.copy()
-            sf_rs_centered.coords = np.array([np.concatenate(c) for c in coords_split])
-            sf_rs_centered = sf_rs_centered[:, :out_height_width[0], :out_height_width[1]]
-            return sf_rs_centered.todense()
+        def sf_to_centeredROIs(sf, centroids):
+            sf = sf.tocsr()
+            assert np.all(np.diff(sf.indptr) > 0), \
+                f"RH ERROR: Found ROIs with no non-zero pixels in the spatial footprints. Indices: {np.where(np.diff(sf.indptr) == 0)[0]}"
+            return _sf_to_centeredROIs_csr(
+                sf=sf,
+                centroids=centroids,
+                FOV_width=self.FOV_width,
+                out_height_width=out_height_width,
+                dtype=output_dtype,
+            )
 
         print(f"Computing ROI centered images from spatial footprints") if self._verbose else None
-        ROI_images = [sf_to_centeredROIs(sf, centroids.T, out_height_width=out_height_width) for sf, centroids in zip(self.spatialFootprints, self.centroids)]
+        ROI_images = [sf_to_centeredROIs(sf, centroids) for sf, centroids in zip(self.spatialFootprints, self.centroids)]
 
         return ROI_images
 
@@ -1679,9 +2220,7 @@ class Data_caiman(Data_roicat):
     
         def _import_FOV_image(path_resultsFile):
             with helpers.h5_load(path_resultsFile, return_dict=False) as data:
-                FOV_height, FOV_width = data['estimates']['dims'][()]
-                FOV_image = data['estimates']['b'][()][:,0].reshape(FOV_height, FOV_width, order='F')
-                return FOV_image.astype(np.float32)
+                return self._extract_FOV_image(data)
 
         if images is not None:
             if self._verbose:
@@ -1690,11 +2229,30 @@ class Data_caiman(Data_roicat):
         else:
             if paths_resultsFiles is None:
                 paths_resultsFiles = self.paths_resultsFiles
-            FOV_images = np.stack([_import_FOV_image(p) for p in paths_resultsFiles])
-            FOV_images = FOV_images - FOV_images.min(axis=(1,2), keepdims=True)
-            FOV_images = FOV_images / FOV_images.mean(axis=(1,2), keepdims=True)
+            FOV_images = self._normalize_FOV_images(np.stack([_import_FOV_image(p) for p in paths_resultsFiles]))
 
         return FOV_images
+
+    @staticmethod
+    def _extract_FOV_image(data: Any) -> np.ndarray:
+        """
+        Extracts the ``estimates.b`` image from an open results file as a
+        float32 array of shape *(FOV_height, FOV_width)*.
+        """
+        FOV_height, FOV_width = data['estimates']['dims'][()]
+        FOV_image = data['estimates']['b'][()][:,0].reshape(FOV_height, FOV_width, order='F')
+        return FOV_image.astype(np.float32)
+
+    @staticmethod
+    def _normalize_FOV_images(FOV_images: np.ndarray) -> np.ndarray:
+        """
+        Normalizes a stack of FOV images of shape *(n_sessions, FOV_height,
+        FOV_width)* in place: subtracts the min of each image, then divides by
+        its mean.
+        """
+        np.subtract(FOV_images, FOV_images.min(axis=(1,2), keepdims=True), out=FOV_images)
+        np.divide(FOV_images, FOV_images.mean(axis=(1,2), keepdims=True), out=FOV_images)
+        return FOV_images
     
 
 ############################################
@@ -1846,19 +2404,17 @@ class Data_roiextractors(Data_roicat):
         """
 
         roi_pixel_masks = segObj.get_roi_pixel_masks()
+        height, width = [int(s) for s in segObj.get_image_size()]
 
-        data = [r[:,2] for r in roi_pixel_masks]
-        ij_all = [r[:,:2].astype(np.int64) for r in roi_pixel_masks]
+        lens = np.array([r.shape[0] for r in roi_pixel_masks], dtype=np.int64)
 
-        sf = scipy.sparse.vstack(
-            [
-                scipy.sparse.coo_matrix(
-                    (d, (ij[:,0], ij[:,1])),
-                    shape=tuple(segObj.get_image_size())
-                ).reshape(1, -1) for d,ij in zip(data, ij_all)
-            ]
-        ).tocsr()
-        return sf
+        pixel_masks = np.concatenate(roi_pixel_masks, axis=0)
+        ij = pixel_masks[:,:2].astype(np.int64)
+        ## Flat indices of pixels outside the image would silently wrap into a neighboring row, so check the bounds first
+        if ij.shape[0] > 0 and ((ij.min(axis=0) < 0).any() or (ij[:,0].max() >= height) or (ij[:,1].max() >= width)):
+            raise ValueError(f"RH ERROR: ROI pixel mask coordinates fall outside of the image of shape {(height, width)}.")
+
+        return _make_csr_from_rows(lens=lens, indices=ij[:,0] * width + ij[:,1], data=pixel_masks[:,2], shape=(len(lens), height * width))
 
 
 
@@ -1873,7 +2429,8 @@ def fix_paths(paths: Union[List[Union[str, pathlib.Path]], str, pathlib.Path]) -
     Args:
         paths (Union[List[Union[str, pathlib.Path]], str, pathlib.Path]):
             The input can be either a list of strings or pathlib.Path objects,
-            or a single string or pathlib.Path object.
+            or a single string or pathlib.Path object. Any ``os.PathLike``
+            object is accepted in place of a pathlib.Path.
             
     Returns:
         List[str]: 
@@ -1885,13 +2442,225 @@ def fix_paths(paths: Union[List[Union[str, pathlib.Path]], str, pathlib.Path]) -
             str, or a pathlib.Path object.
     """
     
-    if isinstance(paths, (str, pathlib.Path)):
-        paths_files = [Path(paths).resolve()]
-    elif isinstance(paths[0], (str, pathlib.Path)):
-        paths_files = [Path(path).resolve() for path in paths]
-    else:
+    paths = [paths] if isinstance(paths, (str, os.PathLike)) else list(paths)
+    if not all([isinstance(path, (str, os.PathLike)) for path in paths]):
         raise TypeError("path_files must be a list of str or list of pathlib.Path or a str or pathlib.Path")
-    return [str(p) for p in paths_files]
+    return [str(Path(os.fspath(path)).resolve()) for path in paths]
+
+
+def _csr_rows_yx(
+    sf: scipy.sparse.csr_matrix,
+    FOV_width: int,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Recovers the ROI (row) index and the (y, x) pixel coordinates of each
+    stored element of a sparse array of flattened spatial footprints. The
+    coordinates are obtained from the flat column indices with a single
+    ``np.divmod`` pass.
+
+    Args:
+        sf (scipy.sparse.csr_matrix):
+            Spatial footprints with shape *(n_roi, FOV_height * FOV_width)*.
+            Flattened in 'C' order.
+        FOV_width (int):
+            Width of the field of view in pixels.
+
+    Returns:
+        (Tuple[np.ndarray, np.ndarray, np.ndarray]): tuple containing:
+            rows (np.ndarray):
+                ROI index of each stored element. Shape: *(nnz,)*
+            y (np.ndarray):
+                y coordinate of each stored element. Shape: *(nnz,)*
+            x (np.ndarray):
+                x coordinate of each stored element. Shape: *(nnz,)*
+    """
+    rows = np.repeat(np.arange(sf.shape[0], dtype=np.int64), np.diff(sf.indptr))
+    y, x = np.divmod(sf.indices.astype(np.int64), FOV_width)
+    return rows, y, x
+
+
+def _centroids_centerOfMass_csr(
+    sf: scipy.sparse.csr_matrix,
+    FOV_height: int,
+    FOV_width: int,
+) -> np.ndarray:
+    """
+    Calculates the center of mass of each ROI in a sparse array of flattened
+    spatial footprints. The weight sums and the weighted (y, x) coordinate sums
+    are accumulated per ROI with ``np.bincount`` over the stored elements, so
+    the work and memory scale with the number of stored elements rather than
+    with the size of the FOV.
+
+    Args:
+        sf (scipy.sparse.csr_matrix):
+            Spatial footprints with shape *(n_roi, FOV_height * FOV_width)*.
+            Flattened in 'C' order.
+        FOV_height (int):
+            Height of the field of view in pixels.
+        FOV_width (int):
+            Width of the field of view in pixels.
+
+    Returns:
+        (np.ndarray):
+            centroids (np.ndarray):
+                Unrounded center of mass of each ROI with shape *(n_roi, 2)*.
+                Consists of (y, x) coordinates.
+    """
+    sf = sf.tocsr()
+    n_roi = sf.shape[0]
+    rows, y, x = _csr_rows_yx(sf=sf, FOV_width=FOV_width)
+    w = sf.data.astype(np.float64)
+    w_sum = np.bincount(rows, weights=w, minlength=n_roi)
+    y_sum = np.bincount(rows, weights=w * y, minlength=n_roi)
+    x_sum = np.bincount(rows, weights=w * x, minlength=n_roi)
+    return np.stack([y_sum, x_sum], axis=1) / (w_sum[:, None] + 1e-12)
+
+
+def _centroids_median_csr(
+    sf: scipy.sparse.csr_matrix,
+    FOV_height: int,
+    FOV_width: int,
+) -> np.ndarray:
+    """
+    Calculates the median centroid of each ROI in a sparse array of flattened
+    spatial footprints. The y (x) coordinate is the median of the unique rows
+    (columns) of the FOV that contain a non-zero pixel of the ROI. Computed in a
+    linear pass over the non-zero elements; no dense *(n_roi, FOV_height)* or
+    *(n_roi, FOV_width)* arrays are made.
+
+    Args:
+        sf (scipy.sparse.csr_matrix):
+            Spatial footprints with shape *(n_roi, FOV_height * FOV_width)*.
+            Flattened in 'C' order.
+        FOV_height (int):
+            Height of the field of view in pixels.
+        FOV_width (int):
+            Width of the field of view in pixels.
+
+    Returns:
+        (np.ndarray):
+            centroids (np.ndarray):
+                Unrounded median centroid of each ROI with shape *(n_roi, 2)*.
+                Consists of (y, x) coordinates. ROIs without any non-zero
+                pixels are ``NaN``.
+    """
+    sf = sf.tocsr()
+    n_roi = sf.shape[0]
+    ## Row index and (y, x) coordinates of each non-zero element
+    rows, y, x = _csr_rows_yx(sf=sf, FOV_width=FOV_width)
+    idx_nz = sf.data != 0
+    rows, coords = rows[idx_nz], [y[idx_nz], x[idx_nz]]
+
+    centroids = np.full((n_roi, 2), np.nan, dtype=np.float64)
+    for ii, (coord, n_coord) in enumerate(zip(coords, [FOV_height, FOV_width])):
+        ## Unique (roi, coordinate) pairs, sorted by roi and then by coordinate
+        keys = np.unique(rows * n_coord + coord)
+        rows_u, coord_u = keys // n_coord, keys % n_coord
+        ## Median of each run of sorted coordinates: mean of the two middle elements
+        counts = np.bincount(rows_u, minlength=n_roi)
+        starts = np.cumsum(counts) - counts
+        has_px = counts > 0
+        idx_lo = starts[has_px] + (counts[has_px] - 1) // 2
+        idx_hi = starts[has_px] + counts[has_px] // 2
+        centroids[has_px, ii] = (coord_u[idx_lo] + coord_u[idx_hi]) / 2
+    return centroids
+
+
+def _sf_to_centeredROIs_csr(
+    sf: scipy.sparse.csr_matrix,
+    centroids: np.ndarray,
+    FOV_width: int,
+    out_height_width: Tuple[int, int] = (36, 36),
+    dtype: np.dtype = np.float32,
+) -> np.ndarray:
+    """
+    Crops each ROI in a sparse array of flattened spatial footprints to a small
+    dense image centered on its centroid. The (y, x) coordinates of the non-zero
+    elements are recovered from the CSR column indices and written straight into
+    the preallocated output, so no intermediate array of shape *(n_roi,
+    FOV_height, FOV_width)* is made. Pixels falling outside of the output image
+    are dropped.
+
+    Args:
+        sf (scipy.sparse.csr_matrix):
+            Spatial footprints with shape *(n_roi, FOV_height * FOV_width)*.
+            Flattened in 'C' order.
+        centroids (np.ndarray):
+            Integer centroids of the ROIs with shape *(n_roi, 2)*. Consists of
+            (y, x) coordinates.
+        FOV_width (int):
+            Width of the field of view in pixels.
+        out_height_width (Tuple[int, int]):
+            Height and width of the output images. (Default is *(36, 36)*)
+        dtype (np.dtype):
+            Data type of the output images. Integer types are scaled so that
+            the maximum of each ROI image maps to the maximum of the type (see
+            ``_cast_ROI_images``). (Default is ``np.float32``)
+
+    Returns:
+        (np.ndarray):
+            ROI_images (np.ndarray):
+                Centered ROI images with shape *(n_roi, out_height_width[0],
+                out_height_width[1])*.
+    """
+    if np.issubdtype(dtype, np.integer):
+        return _cast_ROI_images(
+            ROI_images=_sf_to_centeredROIs_csr(sf=sf, centroids=centroids, FOV_width=FOV_width, out_height_width=out_height_width, dtype=np.float32),
+            dtype=dtype,
+        )
+
+    sf = sf.tocsr()
+    if not sf.has_canonical_format:
+        sf = sf.copy()
+        sf.sum_duplicates()
+    n_roi = sf.shape[0]
+    out_height, out_width = int(out_height_width[0]), int(out_height_width[1])
+    half_widths = np.ceil(np.array([out_height, out_width]) / 2).astype(np.int64)
+    centroids = np.asarray(centroids, dtype=np.int64)
+
+    ## Row index and (y, x) coordinates of each non-zero element, shifted to be centered on the centroids
+    rows, y, x = _csr_rows_yx(sf=sf, FOV_width=FOV_width)
+    y += half_widths[0] - centroids[rows, 0]
+    x += half_widths[1] - centroids[rows, 1]
+    valid = (y >= 0) & (y < out_height) & (x >= 0) & (x < out_width)
+
+    ROI_images = np.zeros((n_roi, out_height, out_width), dtype=dtype)
+    ROI_images[rows[valid], y[valid], x[valid]] = sf.data[valid]
+    return ROI_images
+
+
+def _cast_ROI_images(
+    ROI_images: np.ndarray,
+    dtype: np.dtype = np.float32,
+) -> np.ndarray:
+    """
+    Casts ROI images to a given data type. Floating point types are cast
+    directly. For integer types, each ROI image is scaled so that its maximum
+    maps to the maximum value of the type (e.g. 255 for ``np.uint8``). 
+
+    Args:
+        ROI_images (np.ndarray):
+            ROI images with shape *(n_roi, height, width)*.
+        dtype (np.dtype):
+            Data type of the output images. (Default is ``np.float32``)
+
+    Returns:
+        (np.ndarray):
+            ROI_images (np.ndarray):
+                ROI images cast to ``dtype``.
+    """
+    if not np.issubdtype(dtype, np.integer):
+        return ROI_images.astype(dtype, copy=False)
+    ## Scale in a single float32 scratch array (a copy, so the input is untouched), doing every step in place
+    ROI_images = np.array(ROI_images, dtype=np.float32)
+    np.nan_to_num(ROI_images, copy=False)
+    val_max = ROI_images.max(axis=(1, 2), keepdims=True)
+    val_max[val_max <= 0] = 1
+    np.divide(ROI_images, val_max, out=ROI_images)
+    np.clip(ROI_images, 0, 1, out=ROI_images)
+    np.multiply(ROI_images, np.iinfo(dtype).max, out=ROI_images)
+    np.round(ROI_images, out=ROI_images)
+    return ROI_images.astype(dtype)
 
 
 def make_smaller_data(
@@ -1927,7 +2696,6 @@ def make_smaller_data(
             data_out (Data_roicat): 
                 The output data, which is a reduced version of the input data according to the specified parameters.
     """
-    import sparse
     data_out = copy.deepcopy(data)
 
     n_sessions = min(n_sessions, len(data_out.spatialFootprints)) if n_sessions is not None else len(data_out.spatialFootprints)
@@ -1949,12 +2717,10 @@ def make_smaller_data(
         for sf in sf_tmp]
 
     sf_tmp = [sf[g,:] for sf, g in zip(sf_tmp, good_rois)]
+    ## Crop by selecting the flattened ('C' order) columns of the pixels inside the bounds
+    idx_cols_crop = (np.arange(d_height)[bounds_y[0]:bounds_y[1]][:, None] * d_width + np.arange(d_width)[bounds_x[0]:bounds_x[1]][None, :]).reshape(-1)
     data_out.set_spatialFootprints(
-        spatialFootprints=[sparse.COO(s).reshape(
-                shape=(s.shape[0], data.FOV_height, data.FOV_width)
-            )[:, bounds_y[0]:bounds_y[1], :][:, :, bounds_x[0]:bounds_x[1]].reshape(shape=(s.shape[0], -1)).tocsr() \
-            for s in sf_tmp
-        ],
+        spatialFootprints=[s.tocsr()[:, idx_cols_crop] for s in sf_tmp],
         um_per_pixel=data_out.um_per_pixel,
     )
 
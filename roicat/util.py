@@ -1136,10 +1136,12 @@ def make_session_bool(n_roi: np.ndarray,) -> np.ndarray:
             n_roi = np.array([3, 4, 2])
             session_bool = make_session_bool(n_roi)
     """
-    n_roi_total = np.sum(n_roi)
-    r = np.arange(n_roi_total, dtype=np.int64)
-    n_roi_cumsum = np.concatenate([[0], np.cumsum(n_roi)])
-    session_bool = np.vstack([(b_lower <= r) * (r < b_upper) for b_lower, b_upper in zip(n_roi_cumsum[:-1], n_roi_cumsum[1:])]).T
+    n_roi = np.asarray(n_roi, dtype=np.int64)
+    n_roi_total, n_sessions = int(np.sum(n_roi)), n_roi.shape[0]
+    ## Session index of each ROI. Each row of session_bool has exactly one True value.
+    idx_session = np.repeat(np.arange(n_sessions, dtype=np.int64), n_roi)
+    session_bool = np.zeros((n_roi_total, n_sessions), dtype=np.bool_)
+    session_bool[np.arange(n_roi_total, dtype=np.int64), idx_session] = True
     return session_bool
 
 
@@ -1161,7 +1163,8 @@ def split_iby_session(
         (List[Any]): 
             List of arrays split by session.
     """
-    return [x[sum(n_roi_per_session[:ii]):sum(n_roi_per_session[:ii+1])] for ii in range(len(n_roi_per_session))]
+    idx_bounds = np.concatenate([[0], np.cumsum(n_roi_per_session, dtype=np.int64)])
+    return [x[idx_bounds[ii]:idx_bounds[ii+1]] for ii in range(len(n_roi_per_session))]
 
 ##########################################################################################################################
 ############################################### UCID handling ############################################################
@@ -1640,8 +1643,8 @@ def labels_to_labelsBySession(labels, n_roi_bySession):
     """
     assert isinstance(labels, (list, np.ndarray)), f'labels is not a list or np.ndarray. labels={labels}'
     assert isinstance(n_roi_bySession, (list, np.ndarray)), f'n_roi_bySession is not a list or np.ndarray. n_roi_bySession={n_roi_bySession}'
-    labels = np.array(labels)
-    n_roi_bySession = np.array(n_roi_bySession, dtype=np.int64)
+    labels = np.asarray(labels)
+    n_roi_bySession = np.asarray(n_roi_bySession, dtype=np.int64)
     assert labels.ndim == 1, f'labels.ndim={labels.ndim}, but should be 1.'
     assert n_roi_bySession.ndim == 1, f'n_roi_bySession.ndim={n_roi_bySession.ndim}, but should be 1.'
 
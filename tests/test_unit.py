@@ -166,3 +166,256 @@ def test_data_suite2p(dir_data_test, array_hasher):
     assert data.spatialFootprints[0].shape[1] == 512*705, 'ROICaT Error: data.spatialFootprints.shape[1] != 512*705'
     assert array_hasher(data.spatialFootprints[0].toarray()) == '6319b48421caeb23', 'ROICaT Error: data.spatialFootprints[0] != expected values. See code for expected values.'
     assert array_hasher(data.spatialFootprints[13].toarray()) == 'd5495d254954d56c', 'ROICaT Error: data.spatialFootprints[13] != expected values. See code for expected values.'
+
+
+@pytest.fixture
+def random_ROI_stack():
+    """
+    Returns a fresh stack of 30 random sparse ROI images with shape *(30, 40,
+    50)*.
+    """
+    rng = np.random.default_rng(0)
+    return rng.random((30, 40, 50)) * (rng.random((30, 40, 50)) > 0.95)
+
+
+def test_centroids_centerOfMass_csr(random_ROI_stack):
+    """
+    Test that the CSR center of mass matches a dense computation.
+    """
+    from roicat.data_importing_old import _centroids_centerOfMass_csr
+
+    ims = random_ROI_stack
+    FOV_height, FOV_width = ims.shape[1:]
+    sf = scipy.sparse.csr_matrix(ims.reshape(ims.shape[0], -1))
+
+    centroids = _centroids_centerOfMass_csr(sf=sf, FOV_height=FOV_height, FOV_width=FOV_width)
+
+    yy, xx = np.meshgrid(np.arange(FOV_height), np.arange(FOV_width), indexing='ij')
+    w = ims.sum(axis=(1,2))
+    centroids_dense = np.stack([(ims * yy[None]).sum(axis=(1,2)) / w, (ims * xx[None]).sum(axis=(1,2)) / w], axis=1)
+    assert centroids.shape == (30, 2), 'ROICaT Error: centroids.shape != (n_roi, 2)'
+    assert np.allclose(centroids, centroids_dense), 'ROICaT Error: CSR centroids do not match dense centroids.'
+
+
+def test_centroids_median_csr(random_ROI_stack):
+    """
+    Test that the CSR median centroid is the median of the unique rows and
+    columns of each ROI, including ROIs that touch row 0 or column 0.
+    """
+    from roicat.data_importing_old import _centroids_median_csr
+
+    ims = random_ROI_stack
+    FOV_height, FOV_width = ims.shape[1:]
+    ims[0] = 0
+    ims[0, 0, [0, 3, 4]] = 1  ## Only on row 0
+    ims[1] = 0
+    ims[1, [0, 5, 9, 10], 0] = 1  ## Only on column 0
+    ims[2] = 0  ## Empty ROI
+    sf = scipy.sparse.csr_matrix(ims.reshape(ims.shape[0], -1))
+
+    centroids = _centroids_median_csr(sf=sf, FOV_height=FOV_height, FOV_width=FOV_width)
+
+    centroids_expected = np.full((30, 2), np.nan)
+    for ii, im in enumerate(ims):
+        y, x = np.nonzero(im)
+        if y.size > 0:
+            centroids_expected[ii] = [np.median(np.unique(y)), np.median(np.unique(x))]
+    assert centroids.shape == (30, 2), 'ROICaT Error: centroids.shape != (n_roi, 2)'
+    assert np.array_equal(centroids[:2], [[0, 3], [7, 0]]), 'ROICaT Error: median centroids of ROIs on row 0 or column 0 are wrong.'
+    assert np.allclose(centroids, centroids_expected, equal_nan=True), 'ROICaT Error: CSR median centroids do not match np.median of the unique coordinates.'
+
+
+def test_spatialFootprints_npz_cache(tmp_path):
+    """
+    Test the memory-mapped .npz cache for spatial footprints: round trip,
+    rejection of stale or mismatched caches, and that re-saving a cache does
+    not change footprints already loaded from it.
+    """
+    import os
+    from roicat.data_importing_old import _make_path_spatialFootprints_npz, _save_spatialFootprints_npz, _load_spatialFootprints_npz, _memmap_npz
+
+    rng = np.random.default_rng(0)
+    sf = scipy.sparse.csr_matrix((rng.random((20, 300)) > 0.9) * rng.random((20, 300)), dtype=np.float32)
+    meta = {'frame_height_width': np.array([15, 20], dtype=np.int64), 'dtype': np.array(np.dtype(np.float32).str)}
+    meta_other = {'frame_height_width': np.array([15, 20], dtype=np.int64), 'dtype': np.array(np.dtype(np.float64).str)}
+
+    path_source = tmp_path / 'stat.npy'
+    path_source.write_bytes(b'')
+    path_npz = _make_path_spatialFootprints_npz(path_source=path_source, meta=meta)
+    assert path_npz != _make_path_spatialFootprints_npz(path_source=path_source, meta=meta_other), 'ROICaT Error: caches made with different settings share a file name.'
+
+    ## Round trip
+    assert _save_spatialFootprints_npz(path_npz=path_npz, sf=sf, meta=meta), 'ROICaT Error: cache was not saved.'
+    arrays = _memmap_npz(path_npz)
+    with np.load(path_npz) as arrays_npz:
+        assert set(arrays.keys()) == set(arrays_npz.keys()), 'ROICaT Error: memory-mapped .npz members differ from np.load.'
+        assert all([isinstance(arrays[key], np.memmap) and np.array_equal(arrays[key], arrays_npz[key]) for key in arrays_npz.keys()]), 'ROICaT Error: memory-mapped .npz arrays differ from np.load.'
+    sf_loaded = _load_spatialFootprints_npz(path_npz=path_npz, path_source=path_source, meta=meta)
+    assert isinstance(sf_loaded, scipy.sparse.csr_matrix), 'ROICaT Error: cache was not loaded.'
+    assert sf_loaded.dtype == sf.dtype and sf_loaded.shape == sf.shape, 'ROICaT Error: cached dtype or shape differs.'
+    assert np.array_equal(sf_loaded.toarray(), sf.toarray()), 'ROICaT Error: cached spatial footprints differ.'
+
+    ## Settings mismatch
+    assert _load_spatialFootprints_npz(path_npz=path_npz, path_source=path_source, meta=meta_other) is None, 'ROICaT Error: cache with different settings was loaded.'
+
+    ## Re-saving does not change the footprints already memory-mapped from the cache
+    _save_spatialFootprints_npz(path_npz=path_npz, sf=sf * 2, meta=meta)
+    assert np.array_equal(sf_loaded.toarray(), sf.toarray()), 'ROICaT Error: re-saving the cache changed already loaded footprints.'
+
+    ## Stale cache (source file is newer)
+    t = os.stat(path_npz).st_mtime
+    os.utime(path_source, (t + 10, t + 10))
+    assert _load_spatialFootprints_npz(path_npz=path_npz, path_source=path_source, meta=meta) is None, 'ROICaT Error: stale cache was loaded.'
+
+
+def test_transform_statFile_to_spatialFootprints_bounds():
+    """
+    Test that suite2p ROI pixels shifted outside of the frame raise an error
+    instead of wrapping into a neighboring row.
+    """
+    from roicat.data_importing_old import _transform_statFile_to_spatialFootprints
+
+    FOV_height, FOV_width = 30, 40
+    stat = np.array([
+        {'ypix': np.array([0, 0, 1]), 'xpix': np.array([0, FOV_width - 1, 2]), 'lam': np.array([1., 2., 1.], dtype=np.float32)},
+        {'ypix': np.array([FOV_height - 1]), 'xpix': np.array([5]), 'lam': np.array([1.], dtype=np.float32)},
+    ], dtype=object)
+
+    sf = _transform_statFile_to_spatialFootprints(frame_height_width=(FOV_height, FOV_width), stat=stat, shifts=(0, 0))
+    ims = sf.toarray().reshape(2, FOV_height, FOV_width)
+    assert np.isclose(ims[0, 0, FOV_width - 1], 0.5) and np.isclose(ims[1, FOV_height - 1, 5], 1.0), 'ROICaT Error: spatial footprints do not match the stat file.'
+
+    for shifts in [(0, 5), (1, 0)]:
+        with pytest.raises(ValueError):
+            _transform_statFile_to_spatialFootprints(frame_height_width=(FOV_height, FOV_width), stat=stat, shifts=shifts)
+    stat[1]['xpix'] = np.array([-1])
+    with pytest.raises(ValueError):
+        _transform_statFile_to_spatialFootprints(frame_height_width=(FOV_height, FOV_width), stat=stat, shifts=(0, 0))
+
+
+def test_transform_statFile_to_spatialFootprints_integer_lam():
+    """
+    Test that integer suite2p weights with ``dtype=None`` are normalized into
+    floats rather than scaled into (or truncated to) integers.
+    """
+    from roicat.data_importing_old import _transform_statFile_to_spatialFootprints
+
+    stat = np.array([
+        {'ypix': np.array([0, 1, 2]), 'xpix': np.array([0, 1, 2]), 'lam': np.array([1, 2, 1], dtype=np.int64)},
+        {'ypix': np.array([5]), 'xpix': np.array([5]), 'lam': np.array([3], dtype=np.int64)},
+    ], dtype=object)
+
+    sf = _transform_statFile_to_spatialFootprints(frame_height_width=(10, 10), stat=stat, dtype=None, normalize_mask=True)
+    assert sf.dtype == np.float64, 'ROICaT Error: normalized integer weights are not float64.'
+    assert np.allclose(sf.data, [0.25, 0.5, 0.25, 1.0]), 'ROICaT Error: normalized integer weights are wrong.'
+
+    sf = _transform_statFile_to_spatialFootprints(frame_height_width=(10, 10), stat=stat, dtype=None, normalize_mask=False)
+    assert sf.dtype == np.int64 and np.array_equal(sf.data, [1, 2, 1, 3]), 'ROICaT Error: unnormalized integer weights changed.'
+
+
+def test_transform_statFile_to_neuropilMasks_bounds():
+    """
+    Test that suite2p neuropil mask pixels outside of the frame (with or
+    without shifts) raise an error instead of landing on other pixels.
+    """
+    from roicat.data_importing_old import _transform_statFile_to_neuropilMasks
+
+    FOV_height, FOV_width = 30, 40
+    stat = np.array([
+        {'neuropil_mask': np.array([0, FOV_width - 1, FOV_width + 2])},
+        {'neuropil_mask': np.array([FOV_height * FOV_width - 1])},
+    ], dtype=object)
+
+    nm = _transform_statFile_to_neuropilMasks(frame_height_width=(FOV_height, FOV_width), stat=stat, shifts=(0, 0))
+    ims = nm.toarray().reshape(2, FOV_height, FOV_width)
+    assert ims[0, 0, FOV_width - 1] and ims[0, 1, 2] and ims[1, FOV_height - 1, FOV_width - 1] and ims.sum() == 4, 'ROICaT Error: neuropil masks do not match the stat file.'
+
+    for shifts in [(0, 1), (1, 0)]:
+        with pytest.raises(ValueError):
+            _transform_statFile_to_neuropilMasks(frame_height_width=(FOV_height, FOV_width), stat=stat, shifts=shifts)
+    for mask in [np.array([5, FOV_height * FOV_width + 5]), np.array([-3, 7])]:
+        stat[1]['neuropil_mask'] = mask
+        with pytest.raises(ValueError):
+            _transform_statFile_to_neuropilMasks(frame_height_width=(FOV_height, FOV_width), stat=stat, shifts=(0, 0))
+
+
+def test_caiman_extract_spatialFootprints_F_to_C():
+    """
+    Test that CaImAn spatial footprints stored in 'F' order (estimates.A) are
+    converted to 'C' order flattened footprints that match the original
+    images.
+    """
+    from roicat.data_importing_old import Data_caiman
+
+    rng = np.random.default_rng(0)
+    FOV_height, FOV_width = 7, 11
+    ims = rng.random((6, FOV_height, FOV_width)) * (rng.random((6, FOV_height, FOV_width)) > 0.7)
+
+    ## estimates.A is a CSC array of shape (FOV_height * FOV_width, n_roi) with each ROI flattened in 'F' order
+    def make_A(ims_A):
+        A = scipy.sparse.csc_matrix(np.stack([im.reshape(-1, order='F') for im in ims_A], axis=1))
+        return {'data': A.data, 'indices': A.indices, 'indptr': A.indptr, 'shape': np.array(A.shape)}
+    data = {'estimates': {
+        'dims': np.array([FOV_height, FOV_width]),
+        'A': make_A(ims[:4]),
+        'discarded_components': np.array({'A': make_A(ims[4:])}, dtype=object),
+    }}
+
+    sf = Data_caiman._extract_spatialFootprints(data, include_discarded=True)
+    assert sf.shape == (6, FOV_height * FOV_width), 'ROICaT Error: CaImAn spatial footprints have the wrong shape.'
+    assert sf.has_sorted_indices, 'ROICaT Error: CaImAn spatial footprints indices are not sorted.'
+    assert np.array_equal(sf.toarray().reshape(6, FOV_height, FOV_width), ims), 'ROICaT Error: CaImAn spatial footprints do not match the images.'
+
+    sf = Data_caiman._extract_spatialFootprints(data, include_discarded=False)
+    assert np.array_equal(sf.toarray().reshape(4, FOV_height, FOV_width), ims[:4]), 'ROICaT Error: CaImAn spatial footprints (without discarded) do not match the images.'
+
+
+def _make_caiman_data_with_footprints():
+    """
+    Makes a ``Data_caiman`` object holding only random spatial footprints and
+    centroids (no files), for testing its ROI image methods.
+    """
+    from roicat.data_importing_old import Data_caiman, _centroids_centerOfMass_csr
+
+    rng = np.random.default_rng(0)
+    FOV_height, FOV_width = 60, 70
+    ims = np.zeros((5, FOV_height, FOV_width))
+    for ii, (y, x) in enumerate(rng.integers(15, 45, size=(5, 2))):
+        ims[ii, y-4:y+5, x-3:x+4] = rng.random((9, 7)) + 0.1
+
+    data = Data_caiman.__new__(Data_caiman)
+    data._verbose = False
+    data.FOV_height, data.FOV_width = FOV_height, FOV_width
+    data.spatialFootprints = [scipy.sparse.csr_matrix(ims.reshape(5, -1))]
+    data.centroids = [np.round(_centroids_centerOfMass_csr(sf=data.spatialFootprints[0], FOV_height=FOV_height, FOV_width=FOV_width)).astype(np.int64)]
+    return data
+
+
+def test_caiman_import_ROI_centeredImages_out_height_width():
+    """
+    Test that Data_caiman.import_ROI_centeredImages honors out_height_width.
+    """
+    data = _make_caiman_data_with_footprints()
+    ROI_images = data.import_ROI_centeredImages(out_height_width=[20, 24])
+    assert len(ROI_images) == 1 and ROI_images[0].shape == (5, 20, 24), 'ROICaT Error: ROI_images.shape != (n_roi, 20, 24)'
+    assert np.allclose(ROI_images[0].sum(axis=(1,2)), data.spatialFootprints[0].sum(axis=1).A1), 'ROICaT Error: ROI images do not contain the whole ROIs.'
+
+
+def test_caiman_import_ROI_centeredImages_output_dtype():
+    """
+    Test the output_dtype of Data_caiman.import_ROI_centeredImages: integer
+    types are scaled so that each ROI's maximum maps to the type's maximum,
+    and float types are passed through.
+    """
+    data = _make_caiman_data_with_footprints()
+    ROI_images_f32 = data.import_ROI_centeredImages(out_height_width=[20, 24])[0]
+
+    ROI_images_u8 = data.import_ROI_centeredImages(out_height_width=[20, 24], output_dtype=np.uint8)[0]
+    assert ROI_images_u8.dtype == np.uint8, 'ROICaT Error: ROI_images.dtype != np.uint8'
+    assert np.all(ROI_images_u8.max(axis=(1,2)) == 255), 'ROICaT Error: per-ROI maximum of uint8 ROI images != 255'
+    ROI_images_u8_expected = ROI_images_f32 / ROI_images_f32.max(axis=(1,2), keepdims=True) * 255
+    assert np.abs(ROI_images_u8.astype(np.float64) - ROI_images_u8_expected).max() <= 1, 'ROICaT Error: uint8 ROI images are not scaled per ROI.'
+
+    ROI_images_f16 = data.import_ROI_centeredImages(out_height_width=[20, 24], output_dtype=np.float16)[0]
+    assert ROI_images_f16.dtype == np.float16, 'ROICaT Error: ROI_images.dtype != np.float16'
+    assert np.array_equal(ROI_images_f16, ROI_images_f32.astype(np.float16)), 'ROICaT Error: float16 ROI images are not the float32 images cast to float16.'